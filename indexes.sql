@@ -0,0 +1,17 @@
+-- Indexes for the filter/join/sort columns used by the saved dashboard queries.
+-- Generated by the dashboard's Index advisor; run after DMD1.sql.
+SET search_path TO smart_kitchen;
+
+CREATE INDEX IF NOT EXISTS ix_cooking_records_dish_id ON cooking_records (dish_id);
+CREATE INDEX IF NOT EXISTS ix_cooking_records_equipment_id ON cooking_records (equipment_id);
+CREATE INDEX IF NOT EXISTS ix_cooking_records_order_id ON cooking_records (order_id);
+CREATE INDEX IF NOT EXISTS ix_cooking_records_start_time_partial ON cooking_records (start_time DESC) WHERE temp_compliance = 'No' OR time_compliance = 'No';
+CREATE INDEX IF NOT EXISTS ix_equipments_kitchen_id ON equipments (kitchen_id);
+CREATE INDEX IF NOT EXISTS ix_order_dishs_dish_id ON order_dishs (dish_id);
+CREATE INDEX IF NOT EXISTS ix_orders_delivery_id_order_time ON orders (delivery_id, order_time DESC) INCLUDE (delivery_address, payment_method, user_id);
+CREATE INDEX IF NOT EXISTS ix_orders_order_time ON orders (order_time);
+CREATE INDEX IF NOT EXISTS ix_orders_user_id_order_time ON orders (user_id, order_time DESC) INCLUDE (delivery_address, payment_method);
+CREATE INDEX IF NOT EXISTS ix_smart_kitchens_restaurant_id ON smart_kitchens (restaurant_id);
+
+-- Keeps the result cache's max(start_time) watermark lookup an index probe.
+CREATE INDEX IF NOT EXISTS ix_cooking_records_start_time ON cooking_records (start_time);
@@ -0,0 +1,33 @@
+/*
+name: 'Manager: Restaurant Order Statistics (Table)'
+chart: {type: table}
+tags: [manager]
+params: []
+prewarm: {every: 300}
+route: analytics
+*/
+WITH restaurant_orders AS (
+    -- Find orders processed by each restaurant
+    SELECT DISTINCT r.restaurant_id, o.order_id
+    FROM {S}.restaurants r
+    JOIN {S}.smart_kitchens sk ON r.restaurant_id = sk.restaurant_id
+    JOIN {S}.equipments e ON sk.kitchen_id = e.kitchen_id
+    JOIN {S}.cooking_records cr ON e.equipment_id = cr.equipment_id
+    JOIN {S}.orders o ON cr.order_id = o.order_id
+),
+order_revenue AS (
+    -- Calculate revenue for each order
+    SELECT o.order_id, SUM(od.quantity * d.price) as revenue
+    FROM {S}.orders o
+    JOIN {S}.order_dishs od ON o.order_id = od.order_id
+    JOIN {S}.dishs d ON od.dish_id = d.dish_id
+    GROUP BY o.order_id
+)
+SELECT r.name AS restaurant_name,
+    COUNT(ro.order_id) AS total_orders,
+    COALESCE(SUM(orr.revenue), 0) AS total_revenue
+FROM {S}.restaurants r
+LEFT JOIN restaurant_orders ro ON r.restaurant_id = ro.restaurant_id
+LEFT JOIN order_revenue orr ON ro.order_id = orr.order_id
+GROUP BY r.restaurant_id, r.name
+ORDER BY total_revenue DESC;
@@ -0,0 +1,26 @@
+/*
+name: 'Manager: Query the order record of a certain restaurant (Table)'
+chart: {type: table}
+tags: [manager]
+params: [restaurant_id]
+keyset: {key: [o.order_time, o.order_id], columns: [order_time, order_id], desc: true, page_size: 100}
+prewarm: {every: 300, params: {restaurant_id: 'SELECT restaurant_id FROM {S}.restaurants'}}
+*/
+SELECT o.order_id,
+    o.order_time,
+    o.delivery_address,
+    u.name AS customer_name,
+    u.phone AS customer_phone,
+    o.payment_method
+FROM {S}.orders o
+JOIN {S}.users u ON o.user_id = u.user_id
+JOIN {S}.order_dishs od ON o.order_id = od.order_id
+JOIN {S}.dishs d ON od.dish_id = d.dish_id
+JOIN {S}.cooking_records cr ON o.order_id = cr.order_id
+JOIN {S}.equipments e ON cr.equipment_id = e.equipment_id
+JOIN {S}.smart_kitchens sk ON e.kitchen_id = sk.kitchen_id
+WHERE sk.restaurant_id = :restaurant_id
+    AND {KEYSET}
+GROUP BY o.order_id, o.order_time, o.delivery_address, u.name, u.phone, o.payment_method
+ORDER BY o.order_time DESC, o.order_id DESC
+LIMIT 100;
@@ -0,0 +1,18 @@
+/*
+name: 'Manager: Dish Sales Ranking (Bar)'
+chart: {type: bar, x: dish_name, y: total_sold}
+tags: [manager]
+params: []
+prewarm: {every: 600}
+route: replica
+*/
+SELECT d.dish_name, 
+       SUM(od.quantity) AS total_sold,
+       d.category
+FROM {S}.dishs d
+JOIN {S}.order_dishs od ON d.dish_id = od.dish_id
+JOIN {S}.orders o ON od.order_id = o.order_id
+WHERE o.order_time >= CURRENT_DATE - INTERVAL '7 days'
+GROUP BY d.dish_id, d.dish_name, d.category
+ORDER BY total_sold DESC
+LIMIT 10;
@@ -0,0 +1,11 @@
+/*
+name: 'Manager: Payment Method Distribution (Pie)'
+chart: {type: pie, names: payment_method, values: order_count}
+tags: [manager]
+params: []
+*/
+SELECT payment_method,
+    COUNT(*) AS order_count
+FROM {S}.orders
+GROUP BY payment_method
+ORDER BY order_count DESC;
@@ -0,0 +1,28 @@
+/*
+name: 'Chef: Latest 20 Pending Dishes with Order and Restaurant Info (Table)'
+chart: {type: table}
+tags: [chef]
+params: [restaurant_id]
+prewarm: {every: 120, params: {restaurant_id: 'SELECT restaurant_id FROM {S}.restaurants'}}
+*/
+SELECT DISTINCT o.order_id,
+    o.order_time,
+    r.name AS restaurant_name,
+    d.dish_name,
+    od.quantity,
+    d.standard_cook_time,
+    d.standard_cook_temp
+FROM {S}.orders o
+JOIN {S}.order_dishs od ON o.order_id = od.order_id
+JOIN {S}.dishs d ON od.dish_id = d.dish_id
+JOIN {S}.cooking_records cr ON o.order_id = cr.order_id AND od.dish_id = cr.dish_id
+JOIN {S}.equipments e ON cr.equipment_id = e.equipment_id
+JOIN {S}.smart_kitchens sk ON e.kitchen_id = sk.kitchen_id
+JOIN {S}.restaurants r ON sk.restaurant_id = r.restaurant_id
+WHERE r.restaurant_id = :restaurant_id
+    AND o.order_id NOT IN (
+        SELECT DISTINCT order_id FROM {S}.cooking_records 
+        WHERE start_time::date = CURRENT_DATE
+    )
+ORDER BY o.order_time DESC
+LIMIT 20;
@@ -0,0 +1,17 @@
+/*
+name: 'Chef: Time Compliance Rate Statistics (Bar)'
+chart: {type: bar, x: dish_name, y: time_compliance_rate}
+tags: [chef]
+params: [days]
+prewarm: {every: 600}
+*/
+-- Reads the per-day rollup (see PG_ROLLUP_DDL) instead of scanning cooking_records.
+SELECT d.dish_name, 
+    SUM(r.total_cooks)::bigint AS total_cooks,
+    ROUND(SUM(r.time_yes) * 100.0 / SUM(r.total_cooks), 2) AS time_compliance_rate
+FROM {S}.dish_compliance_daily r
+JOIN {S}.dishs d ON r.dish_id = d.dish_id
+WHERE r.day >= CURRENT_DATE - make_interval(days => :days)
+GROUP BY d.dish_id, d.dish_name
+HAVING SUM(r.total_cooks) > 0
+ORDER BY time_compliance_rate ASC
@@ -0,0 +1,19 @@
+/*
+name: 'Chef: Equipment Maintenance Reminder (Table)'
+chart: {type: table}
+tags: [chef]
+params: []
+route: analytics
+*/
+SELECT e.equipment_id,
+    sk.name AS kitchen_name,
+    e.production_date,
+    CASE WHEN COUNT(cr.record_id) > 1000 THEN 'Maintenance Required'
+            WHEN e.production_date < CURRENT_DATE - INTERVAL '3 years' THEN 'Aging Equipment'
+            ELSE 'Normal' END AS status
+FROM {S}.equipments e
+JOIN {S}.smart_kitchens sk ON e.kitchen_id = sk.kitchen_id
+LEFT JOIN {S}.cooking_records cr ON e.equipment_id = cr.equipment_id
+GROUP BY e.equipment_id, sk.name, e.production_date
+HAVING COUNT(cr.record_id) > 1000 OR e.production_date < CURRENT_DATE - INTERVAL '3 years'
+ORDER BY status, COUNT(cr.record_id) DESC;
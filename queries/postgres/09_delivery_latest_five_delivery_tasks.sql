@@ -0,0 +1,19 @@
+/*
+name: 'Delivery: Latest Five Delivery Tasks (Table)'
+chart: {type: table}
+tags: [delivery]
+params: [delivery_id]
+*/
+SELECT o.order_id,
+    o.order_time,
+    o.delivery_address,
+    u.name AS customer_name,
+    u.phone AS customer_phone,
+    COUNT(od.dish_id) AS total_items
+FROM {S}.orders o
+JOIN {S}.users u ON o.user_id = u.user_id
+JOIN {S}.order_dishs od ON o.order_id = od.order_id
+WHERE o.delivery_id = :delivery_id
+GROUP BY o.order_id, o.order_time, o.delivery_address, u.name, u.phone
+ORDER BY o.order_time DESC
+LIMIT 5;
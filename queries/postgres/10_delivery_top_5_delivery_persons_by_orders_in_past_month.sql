@@ -0,0 +1,15 @@
+/*
+name: 'Delivery: Top 5 Delivery Persons by Orders in Past Month (Bar)'
+chart: {type: bar, x: delivery_person, y: total_orders}
+tags: [delivery]
+params: []
+route: replica
+*/
+SELECT dp.name AS delivery_person,
+    COUNT(DISTINCT o.order_id) AS total_orders
+FROM {S}.delivery_persons dp
+JOIN {S}.orders o ON dp.delivery_id = o.delivery_id
+WHERE o.order_time >= CURRENT_DATE - INTERVAL '30 days'
+GROUP BY dp.delivery_id, dp.name
+ORDER BY total_orders DESC
+LIMIT 5;
@@ -0,0 +1,25 @@
+/*
+name: 'Delivery: All Delivery Records in Past Year (Table)'
+chart: {type: table}
+tags: [delivery]
+params: [delivery_id]
+keyset: {key: [o.order_time, o.order_id], columns: [order_time, order_id], desc: true, page_size: 100}
+*/
+SELECT o.order_id,
+    o.order_time,
+    o.delivery_address,
+    u.name AS customer_name,
+    u.phone AS customer_phone,
+    o.payment_method,
+    COUNT(od.dish_id) AS total_items,
+    SUM(od.quantity * d.price) AS total_amount
+FROM {S}.orders o
+JOIN {S}.users u ON o.user_id = u.user_id
+JOIN {S}.order_dishs od ON o.order_id = od.order_id
+JOIN {S}.dishs d ON od.dish_id = d.dish_id
+WHERE o.delivery_id = :delivery_id
+AND o.order_time >= CURRENT_DATE - INTERVAL '365 days'
+AND {KEYSET}
+GROUP BY o.order_id, o.order_time, o.delivery_address, u.name, u.phone, o.payment_method
+ORDER BY o.order_time DESC, o.order_id DESC
+LIMIT 100;
@@ -0,0 +1,22 @@
+/*
+name: 'Customer: My Order History (Table)'
+chart: {type: table}
+tags: [customer]
+params: [user_id]
+keyset: {key: [o.order_time, o.order_id], columns: [order_time, order_id], desc: true, page_size: 10}
+*/
+-- Some users have not placed any orders for dishes.
+-- If "no rows" is displayed, you can try changing the value of user_id.
+SELECT o.order_id,
+       o.order_time,
+       o.delivery_address,
+       o.payment_method,
+       SUM(od.quantity * d.price) AS total_amount
+FROM {S}.orders o
+JOIN {S}.order_dishs od ON o.order_id = od.order_id
+JOIN {S}.dishs d ON od.dish_id = d.dish_id
+WHERE o.user_id = :user_id
+    AND {KEYSET}
+GROUP BY o.order_id, o.order_time, o.delivery_address, o.payment_method
+ORDER BY o.order_time DESC, o.order_id DESC
+LIMIT 10;
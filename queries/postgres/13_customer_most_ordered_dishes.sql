@@ -0,0 +1,15 @@
+/*
+name: 'Customer: Most Ordered Dishes (Pie)'
+chart: {type: pie, names: dish_name, values: times_ordered}
+tags: [customer]
+params: [user_id]
+*/
+SELECT d.dish_name,
+       SUM(od.quantity) AS times_ordered
+FROM {S}.orders o
+JOIN {S}.order_dishs od ON o.order_id = od.order_id
+JOIN {S}.dishs d ON od.dish_id = d.dish_id
+WHERE o.user_id = :user_id
+GROUP BY d.dish_id, d.dish_name
+ORDER BY times_ordered DESC
+LIMIT 8;
@@ -0,0 +1,14 @@
+/*
+name: 'Customer: Price Distribution by Dish Category (Bar)'
+chart: {type: bar, x: category, y: avg_price}
+tags: [customer]
+params: []
+*/
+SELECT category,
+    COUNT(*) AS dish_count,
+    ROUND(AVG(price), 2) AS avg_price,
+    ROUND(MIN(price), 2) AS min_price,
+    ROUND(MAX(price), 2) AS max_price
+FROM {S}.dishs
+GROUP BY category
+ORDER BY avg_price DESC;
@@ -0,0 +1,12 @@
+/*
+name: 'Customer: Dish Price Ranking (Table)'
+chart: {type: table}
+tags: [customer]
+params: []
+stream: true
+*/
+SELECT dish_name,
+    price,
+    category
+FROM {S}.dishs
+ORDER BY price DESC;
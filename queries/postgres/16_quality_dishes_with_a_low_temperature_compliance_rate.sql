@@ -0,0 +1,16 @@
+/*
+name: 'Quality: Dishes with a low temperature compliance rate (Table)'
+chart: {type: table}
+tags: [quality]
+params: []
+*/
+SELECT d.dish_name,
+    SUM(r.total_cooks)::bigint AS total_cooks,
+    ROUND(SUM(r.temp_yes) * 100.0 / SUM(r.total_cooks), 2) AS compliance_rate
+FROM {S}.dish_compliance_daily r
+JOIN {S}.dishs d ON r.dish_id = d.dish_id
+WHERE r.day >= CURRENT_DATE - INTERVAL '1 day'
+GROUP BY d.dish_id, d.dish_name
+HAVING SUM(r.total_cooks) > 0
+ORDER BY compliance_rate ASC
+LIMIT 5;
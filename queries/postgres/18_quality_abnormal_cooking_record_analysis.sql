@@ -0,0 +1,19 @@
+/*
+name: 'Quality: Abnormal Cooking Record Analysis (Table)'
+chart: {type: table}
+tags: [quality]
+params: []
+stream: true
+*/
+SELECT cr.record_id,
+    d.dish_name,
+    e.equipment_id,
+    cr.average_cook_temperature,
+    cr.temp_compliance,
+    cr.time_compliance,
+    cr.start_time
+FROM {S}.cooking_records cr
+JOIN {S}.dishs d ON cr.dish_id = d.dish_id
+JOIN {S}.equipments e ON cr.equipment_id = e.equipment_id
+WHERE cr.temp_compliance = 'No' OR cr.time_compliance = 'No'
+ORDER BY cr.start_time DESC
@@ -0,0 +1,15 @@
+/*
+name: 'Quality: Dish Compliance Rate Comparison (Bar)'
+chart: {type: bar, x: dish_name, y: [temp_compliance_rate, time_compliance_rate]}
+tags: [quality]
+params: []
+route: analytics
+*/
+-- Dishes that were never cooked keep their 0% row, as with the old LEFT JOIN on cooking_records.
+SELECT d.dish_name,
+    ROUND(COALESCE(SUM(r.temp_yes), 0) * 100.0 / GREATEST(COALESCE(SUM(r.total_cooks), 0), 1), 2) AS temp_compliance_rate,
+    ROUND(COALESCE(SUM(r.time_yes), 0) * 100.0 / GREATEST(COALESCE(SUM(r.total_cooks), 0), 1), 2) AS time_compliance_rate
+FROM {S}.dishs d
+LEFT JOIN {S}.dish_compliance_daily r ON d.dish_id = r.dish_id
+GROUP BY d.dish_id, d.dish_name
+ORDER BY temp_compliance_rate DESC
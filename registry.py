@@ -0,0 +1,202 @@
+"""Saved queries, one file per panel, under QUERY_DIR (default: queries/ next to config.py).
+
+    queries/postgres/*.sql    a /* ... */ YAML header, then the SQL
+    queries/mongo/*.yaml      the query as a YAML mapping
+    queries/federated/*.yaml  a Postgres query and a Mongo query joined on equipment ID
+
+Every query has a "name" (the label in the dashboard), a "chart" ({"type": "table" | "bar" | ...}
+plus the columns to plot) and "params", the sidebar values it uses. Postgres queries also have
+"tags" (the roles that see them) and may have:
+    keyset:   {"key": [<sort expressions>], "columns": [...], "desc": bool, "page_size": n};
+              the WHERE clause then has an `AND {KEYSET}` (see keyset_sql in app.py)
+    stream:   true to fetch the result page by page through a server-side cursor
+    prewarm:  {"every": <seconds>, "params": {<name>: <list, or SQL returning the values>}};
+              re-run in the background for each parameter set (see PREWARM in app.py)
+    max_rows: a row cap other than CONFIG["postgres"]["max_rows"]
+    route:    "primary" (default), "replica" or "analytics": the server it reads from (PG_ROUTES in app.py)
+Mongo queries have a "collection" and either an "aggregate" pipeline or a "downsample"
+({"field": <$path>}, see downsample_pipeline in config.py), and may have a "schema" (column
+types) and "live" (see live_tick in app.py). A federated query has:
+    drive:    "postgres" or "mongo", the side that runs first; the equipment IDs it returns filter
+              the other side, whose columns are added to its rows
+    postgres: SQL returning an equipment_id column; when the Mongo side drives, it filters on
+              `equipment_id = ANY(:equipment_ids)`
+    mongo:    {"collection", "key": <path of the equipment ID>, "match", "sort", "limit", "project"}
+plus "tags", "params", "route", "schema" (of the Mongo columns) and "chart" as above. Panels are
+listed in file-name order.
+
+A file is parsed, validated and its SQL qualified with the schema once, when it is loaded;
+QueryRegistry.load() re-reads only the files whose modification time changed. A file that fails
+to load keeps its last good version, and the error is reported in `errors`.
+"""
+import os
+import re
+import threading
+
+import yaml
+
+CHART_TYPES = {"table", "bar", "line", "pie", "heatmap", "treemap"}
+SCHEMA_TYPES = {"datetime", "float", "int", "bool", "string", "category"}
+ROUTES = ("primary", "replica", "analytics")
+_BIND = re.compile(r"(?<![:\w]):(\w+)")
+_HEADER = re.compile(r"\A\s*/\*(.*?)\*/", re.S)
+
+
+def _check(cond, message: str):
+    if not cond:
+        raise ValueError(message)
+
+
+def _is_number(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _is_str_list(v) -> bool:
+    return isinstance(v, list) and all(isinstance(x, str) for x in v)
+
+
+def _validate_schema(q: dict):
+    _check(isinstance(q.get("schema", {}), dict), "'schema' must be a mapping of column: type")
+    bad = {k: v for k, v in q.get("schema", {}).items() if v not in SCHEMA_TYPES}
+    _check(not bad, f"unknown schema types {bad}; use one of {sorted(SCHEMA_TYPES)}")
+
+
+def _validate_common(q: dict, params: set):
+    _check(isinstance(q.get("name"), str) and q["name"], "missing 'name'")
+    chart = q.get("chart")
+    _check(isinstance(chart, dict) and chart.get("type") in CHART_TYPES,
+           f"'chart' needs a type, one of {sorted(CHART_TYPES)}")
+    _check(_is_str_list(q.get("params", [])), "'params' must be a list of names")
+    _check(_is_str_list(q.get("tags", [])), "'tags' must be a list of roles")
+    _check(isinstance(q.get("max_rows", 1), int) and q.get("max_rows", 1) > 0, "'max_rows' must be a positive integer")
+    unknown = set(q.get("params", [])) - params
+    _check(not unknown, f"unknown params {sorted(unknown)}; known are {sorted(params)}")
+
+
+def parse_postgres(text: str, qualify, params: set) -> dict:
+    m = _HEADER.match(text)
+    _check(m, "a Postgres query file starts with a /* YAML */ header")
+    q = yaml.safe_load(m.group(1)) or {}
+    _check(isinstance(q, dict), "the header must be a YAML mapping")
+    q["sql"] = text[m.end():].strip() + "\n"
+    q.setdefault("tags", [])
+    q.setdefault("params", [])
+    _validate_common(q, params)
+    binds = {b for b in _BIND.findall(q["sql"]) if not b.startswith("keyset_")}
+    _check(binds <= set(q["params"]), f"binds {sorted(binds - set(q['params']))} are not in 'params'")
+    if "keyset" in q:
+        ks = q["keyset"]
+        _check(isinstance(ks, dict) and _is_str_list(ks.get("key", [])) and _is_str_list(ks.get("columns", []))
+               and isinstance(ks.get("page_size", 0), int), "'keyset' must be a mapping like "
+               "{key: [<sort expressions>], columns: [...], desc: bool, page_size: n}")
+        _check("{KEYSET}" in q["sql"] and "ORDER BY" in q["sql"].upper(),
+               "a keyset query needs 'AND {KEYSET}' in its WHERE clause and an ORDER BY")
+        _check(len(ks.get("key", [])) == len(ks.get("columns", [])) > 0 and ks.get("page_size", 0) > 0,
+               "'keyset' needs matching 'key' and 'columns' lists and a 'page_size'")
+        _check(not q.get("stream"), "a query is either 'keyset' or 'stream', not both")
+    if "prewarm" in q:
+        _check(isinstance(q["prewarm"], dict) and _is_number(q["prewarm"].get("every")) and q["prewarm"]["every"] > 0,
+               "'prewarm' needs 'every' (seconds)")
+        _check(isinstance(q["prewarm"].get("params", {}), dict)
+               and all(isinstance(v, (list, str)) for v in q["prewarm"].get("params", {}).values()),
+               "'prewarm' params map each name to a list of values or a SQL query")
+        _check(set(q["prewarm"].get("params", {})) <= set(q["params"]), "'prewarm' params must be in 'params'")
+    _check(q.setdefault("route", "primary") in ROUTES, f"'route' must be one of {list(ROUTES)}")
+    q["qualified"] = qualify(q["sql"])
+    return q
+
+
+def parse_mongo(text: str, qualify, params: set) -> dict:
+    q = yaml.safe_load(text)
+    _check(isinstance(q, dict), "a Mongo query file is a YAML mapping")
+    _validate_common(q, params)
+    _check(isinstance(q.get("collection"), str), "missing 'collection'")
+    if "downsample" in q:
+        _check(isinstance(q["downsample"], dict) and "field" in q["downsample"], "'downsample' needs a 'field'")
+    else:
+        stages = q.get("aggregate")
+        _check(isinstance(stages, list) and all(isinstance(s, dict) and len(s) == 1 and next(iter(s)).startswith("$")
+                                                for s in stages),
+               "'aggregate' must be a list of single-operator stages like {$match: ...}")
+    if "live" in q:
+        _check(isinstance(q["live"], dict) and isinstance(q["live"].get("time"), str) and "keep" in q["live"],
+               "'live' needs the 'time' column and how many rows to 'keep'")
+    _validate_schema(q)
+    return q
+
+
+def parse_federated(text: str, qualify, params: set) -> dict:
+    q = yaml.safe_load(text)
+    _check(isinstance(q, dict), "a federated query file is a YAML mapping")
+    q.setdefault("tags", [])
+    q.setdefault("params", [])
+    _validate_common(q, params)
+    _check(q.get("drive") in ("postgres", "mongo"), "'drive' must be 'postgres' or 'mongo'")
+    _check(isinstance(q.get("postgres"), str) and "equipment_id" in q["postgres"],
+           "'postgres' must be SQL returning an equipment_id column")
+    binds = set(_BIND.findall(q["postgres"]))
+    _check(binds <= set(q["params"]) | {"equipment_ids"},
+           f"binds {sorted(binds - set(q['params']) - {'equipment_ids'})} are not in 'params'")
+    _check(q["drive"] == "postgres" or "equipment_ids" in binds,
+           "when the Mongo side drives, the SQL filters on :equipment_ids")
+    mongo = q.get("mongo")
+    _check(isinstance(mongo, dict) and isinstance(mongo.get("collection"), str) and isinstance(mongo.get("key"), str),
+           "'mongo' needs a 'collection' and the 'key' path of the equipment ID")
+    _check(isinstance(mongo.get("project", {}), dict), "'mongo.project' must be a mapping of column: expression")
+    _check(all(isinstance(mongo.get(k, {}), dict) for k in ("match", "sort")), "'mongo.match' and 'mongo.sort' are mappings")
+    _check(isinstance(mongo.get("limit", 1), int) and mongo.get("limit", 1) > 0, "'mongo.limit' must be a positive integer")
+    _check(q.setdefault("route", "primary") in ROUTES, f"'route' must be one of {list(ROUTES)}")
+    _validate_schema(q)
+    q["qualified"] = qualify(q["postgres"])
+    return q
+
+
+PARSERS = {"postgres": (".sql", parse_postgres), "mongo": (".yaml", parse_mongo),
+           "federated": (".yaml", parse_federated)}
+
+
+class QueryRegistry:
+    def __init__(self, root: str, qualify, params):
+        self.root, self.qualify, self.params = root, qualify, set(params)
+        self.lock = threading.Lock()
+        self.files = {}    # path -> (mtime_ns, store, query) of its last good version
+        self.errors = {}   # path -> why it failed to load
+        self.stamp = None
+        self.queries = {store: {} for store in PARSERS}
+
+    def _scan(self) -> list[tuple[str, str, int]]:
+        found = []
+        for store, (ext, _) in PARSERS.items():
+            folder = os.path.join(self.root, store)
+            if not os.path.isdir(folder):
+                continue
+            for entry in sorted(os.scandir(folder), key=lambda e: e.name):
+                if entry.is_file() and entry.name.endswith(ext):
+                    found.append((store, entry.path, entry.stat().st_mtime_ns))
+        return found
+
+    def load(self) -> bool:
+        # Re-reads new and changed files; True when the query sets were replaced.
+        with self.lock:
+            found = self._scan()
+            if found == self.stamp:
+                return False
+            files, errors, queries = {}, {}, {store: {} for store in PARSERS}
+            for store, path, mtime in found:
+                entry = self.files.get(path)
+                if entry is None or entry[0] != mtime:
+                    try:
+                        with open(path, encoding="utf-8") as f:
+                            entry = (mtime, store, PARSERS[store][1](f.read(), self.qualify, self.params))
+                    except Exception as e:   # anything a malformed file can raise: keep the last good version
+                        errors[path] = " ".join(str(e).split()) or type(e).__name__
+                        if entry is None:
+                            continue
+                files[path] = entry
+                q = entry[2]
+                if q["name"] in queries[store]:
+                    errors[path] = f"duplicate query name {q['name']!r}"
+                    continue
+                queries[store][q["name"]] = {k: v for k, v in q.items() if k != "name"}
+            self.files, self.errors, self.stamp, self.queries = files, errors, found, queries
+            return True
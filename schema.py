@@ -0,0 +1,524 @@
+"""Database objects the dashboard relies on beyond DMD1.sql: the compliance rollup in Postgres,
+the time-series layout of `sensor`, the `sensor_latest` snapshot, the `sensor_counters` rollup
+and the `sensor_alerts` anomaly events in MongoDB. Shared with the command-line tools
+(generate.py, ingest.py).
+
+pymongo is imported by the functions that need it, so the dashboard can import the Postgres
+objects without loading it.
+"""
+from __future__ import annotations
+
+import datetime as dt
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from pymongo import MongoClient
+
+# Per-dish, per-day compliance counts. The statement-level triggers fold every
+# insert/update/delete/truncate on cooking_records into the rollup, so the compliance
+# queries in config.py cost days x dishes instead of a full cooking_records scan.
+# Records without a dish (dish_id is nullable) are left out, as the joins to dishs did.
+# PG_ROLLUP_FUNCTION alone takes no table lock, so it can be re-applied to an installed rollup.
+PG_ROLLUP_TRIGGERS = ("dish_compliance_daily_ins", "dish_compliance_daily_upd", "dish_compliance_daily_del",
+                      "dish_compliance_daily_trunc")
+PG_ROLLUP_FUNCTION = """
+CREATE OR REPLACE FUNCTION {S}.dish_compliance_daily_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO {S}.dish_compliance_daily AS r
+            (day, dish_id, total_cooks, temp_yes, temp_no, time_yes, time_no)
+        SELECT start_time::date, dish_id,
+            -COUNT(*),
+            -COUNT(*) FILTER (WHERE temp_compliance = 'Yes'),
+            -COUNT(*) FILTER (WHERE temp_compliance = 'No'),
+            -COUNT(*) FILTER (WHERE time_compliance = 'Yes'),
+            -COUNT(*) FILTER (WHERE time_compliance = 'No')
+        FROM old_rows
+        WHERE dish_id IS NOT NULL
+        GROUP BY start_time::date, dish_id
+        ON CONFLICT (day, dish_id) DO UPDATE SET
+            total_cooks = r.total_cooks + EXCLUDED.total_cooks,
+            temp_yes = r.temp_yes + EXCLUDED.temp_yes,
+            temp_no = r.temp_no + EXCLUDED.temp_no,
+            time_yes = r.time_yes + EXCLUDED.time_yes,
+            time_no = r.time_no + EXCLUDED.time_no;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO {S}.dish_compliance_daily AS r
+            (day, dish_id, total_cooks, temp_yes, temp_no, time_yes, time_no)
+        SELECT start_time::date, dish_id,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE temp_compliance = 'Yes'),
+            COUNT(*) FILTER (WHERE temp_compliance = 'No'),
+            COUNT(*) FILTER (WHERE time_compliance = 'Yes'),
+            COUNT(*) FILTER (WHERE time_compliance = 'No')
+        FROM new_rows
+        WHERE dish_id IS NOT NULL
+        GROUP BY start_time::date, dish_id
+        ON CONFLICT (day, dish_id) DO UPDATE SET
+            total_cooks = r.total_cooks + EXCLUDED.total_cooks,
+            temp_yes = r.temp_yes + EXCLUDED.temp_yes,
+            temp_no = r.temp_no + EXCLUDED.temp_no,
+            time_yes = r.time_yes + EXCLUDED.time_yes,
+            time_no = r.time_no + EXCLUDED.time_no;
+    END IF;
+    IF TG_OP = 'TRUNCATE' THEN
+        TRUNCATE {S}.dish_compliance_daily;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+PG_ROLLUP_DDL = """
+CREATE TABLE IF NOT EXISTS {S}.dish_compliance_daily (
+    day DATE NOT NULL,
+    dish_id INT NOT NULL,
+    total_cooks BIGINT NOT NULL DEFAULT 0,
+    temp_yes BIGINT NOT NULL DEFAULT 0,
+    temp_no BIGINT NOT NULL DEFAULT 0,
+    time_yes BIGINT NOT NULL DEFAULT 0,
+    time_no BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, dish_id)
+);
+
+""" + PG_ROLLUP_FUNCTION + """
+DROP TRIGGER IF EXISTS dish_compliance_daily_ins ON {S}.cooking_records;
+DROP TRIGGER IF EXISTS dish_compliance_daily_upd ON {S}.cooking_records;
+DROP TRIGGER IF EXISTS dish_compliance_daily_del ON {S}.cooking_records;
+DROP TRIGGER IF EXISTS dish_compliance_daily_trunc ON {S}.cooking_records;
+CREATE TRIGGER dish_compliance_daily_ins AFTER INSERT ON {S}.cooking_records
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {S}.dish_compliance_daily_apply();
+CREATE TRIGGER dish_compliance_daily_upd AFTER UPDATE ON {S}.cooking_records
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {S}.dish_compliance_daily_apply();
+CREATE TRIGGER dish_compliance_daily_del AFTER DELETE ON {S}.cooking_records
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {S}.dish_compliance_daily_apply();
+CREATE TRIGGER dish_compliance_daily_trunc AFTER TRUNCATE ON {S}.cooking_records
+    FOR EACH STATEMENT EXECUTE FUNCTION {S}.dish_compliance_daily_apply();
+"""
+
+PG_ROLLUP_BACKFILL = """
+TRUNCATE {S}.dish_compliance_daily;
+INSERT INTO {S}.dish_compliance_daily
+    (day, dish_id, total_cooks, temp_yes, temp_no, time_yes, time_no)
+SELECT start_time::date, dish_id,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE temp_compliance = 'Yes'),
+    COUNT(*) FILTER (WHERE temp_compliance = 'No'),
+    COUNT(*) FILTER (WHERE time_compliance = 'Yes'),
+    COUNT(*) FILTER (WHERE time_compliance = 'No')
+FROM {S}.cooking_records
+WHERE dish_id IS NOT NULL
+GROUP BY start_time::date, dish_id;
+"""
+
+# The sensor collection as a native time-series collection, plus the indexes the
+# saved aggregations need to avoid sorting/grouping the whole history in memory.
+SENSOR_TS_OPTIONS = {"timeField": "ts", "metaField": "meta", "granularity": "minutes"}
+SENSOR_INDEXES = {
+    "meta_equipment_id_ts": [("meta.equipment_id", 1), ("ts", -1)],
+    "meta_sensor_id_ts": [("meta.sensor_id", 1), ("ts", -1)],
+    "ts_desc": [("ts", -1)],
+}
+
+def sensor_collection_status(client: MongoClient, db_name: str, coll: str = "sensor") -> dict:
+    db = client[db_name]
+    info = next(db.list_collections(filter={"name": coll}), None)
+    if info is None:
+        return {"exists": False, "timeseries": False, "missing": list(SENSOR_INDEXES)}
+    have = [[(k, int(v)) for k, v in ix["key"].items()] for ix in db[coll].list_indexes()]
+    return {
+        "exists": True,
+        "timeseries": info.get("type") == "timeseries",
+        "missing": [name for name, keys in SENSOR_INDEXES.items() if keys not in have],
+    }
+
+def provision_sensor_collection(client: MongoClient, db_name: str, coll: str = "sensor",
+                                batch_size: int = 10_000) -> dict:
+    # Turn `coll` into a time-series collection and create SENSOR_INDEXES on it.
+    # A plain collection is renamed to <coll>_legacy and copied over in ts order; if the copy
+    # is interrupted, running this again resumes from the newest ts already copied. A batch can
+    # stop halfway through a timestamp's readings and a time-series collection has no unique
+    # _id, so the documents already copied for that ts (kept with their legacy _id) are skipped.
+    # The legacy collection is kept so it can be checked and dropped by hand.
+    db = client[db_name]
+    legacy = f"{coll}_legacy"
+    status = sensor_collection_status(client, db_name, coll)
+    if status["exists"] and not status["timeseries"]:
+        db[coll].rename(legacy)
+    if not status["timeseries"]:
+        db.create_collection(coll, timeseries=SENSOR_TS_OPTIONS)
+
+    copied = skipped = 0
+    if legacy in db.list_collection_names():
+        db[legacy].create_index([("ts", 1)])
+        last = next(db[coll].find({}, {"ts": 1}).sort("ts", -1).limit(1), None)
+        done = {d["_id"] for d in db[coll].find({"ts": last["ts"]}, {"_id": 1})} if last else set()
+        cursor = db[legacy].find({"ts": {"$gte": last["ts"]}} if last else {}).sort("ts", 1)
+        batch = []
+        for doc in cursor:
+            if doc["_id"] in done:
+                continue
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                n = _insert_unordered(db[coll], batch)
+                copied, skipped, batch = copied + n, skipped + len(batch) - n, []
+        if batch:
+            n = _insert_unordered(db[coll], batch)
+            copied, skipped = copied + n, skipped + len(batch) - n
+
+    for name, keys in SENSOR_INDEXES.items():
+        db[coll].create_index(keys, name=name)
+    return {"copied": copied, "skipped": skipped, "legacy": legacy}
+
+def _insert_unordered(coll, docs: list) -> int:
+    # Documents without a valid `ts` date are rejected by a time-series collection; keep going.
+    from pymongo.errors import BulkWriteError
+    try:
+        return len(coll.insert_many(docs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        return e.details.get("nInserted", 0)
+
+# sensor_latest: the newest reading per sensor ("sensor:<id>") and per equipment
+# ("equipment:<id>"), so the "current ..." panels read O(#equipment) documents.
+# "_watermark" records the newest sensor.ts already folded in, and when the snapshot last changed.
+SENSOR_LATEST_INDEXES = [
+    [("kind", 1), ("meta.equipment_id", 1)],
+    [("kind", 1), ("temperature_c", -1)],
+    [("kind", 1), ("smoke_concentration.value", -1)],
+]
+
+def upsert_sensor_latest(db, docs: list) -> int:
+    # Only replaces a snapshot entry with a newer reading (ties between an equipment's sensors
+    # go to the lowest sensor_id). When the entry is newer already, the filter misses and the
+    # upsert collides on _id (11000), which is ignored, so folding a document twice is harmless.
+    # Returns the number of entries that changed.
+    from pymongo import ReplaceOne
+    from pymongo.errors import BulkWriteError
+    def newer(d, cur):
+        sid, cur_sid = d["meta"].get("sensor_id") or "", cur["meta"].get("sensor_id") or ""
+        return d["ts"] > cur["ts"] or (d["ts"] == cur["ts"] and sid < cur_sid)
+    latest = {}
+    for d in docs:
+        meta = d.get("meta") or {}
+        for kind in ("sensor", "equipment"):
+            key = meta.get(f"{kind}_id")
+            if key is None or d.get("ts") is None:
+                continue
+            _id = f"{kind}:{key}"
+            if _id not in latest or newer(d, latest[_id][1]):
+                latest[_id] = (kind, d)
+    ops = [ReplaceOne({"_id": _id, "$or": [{"ts": {"$lt": d["ts"]}},
+                                           {"ts": d["ts"], "meta.sensor_id": {"$gt": d["meta"].get("sensor_id")}}]},
+                      {**{k: v for k, v in d.items() if k != "_id"}, "kind": kind},
+                      upsert=True)
+           for _id, (kind, d) in latest.items()]
+    if not ops:
+        return 0
+    try:
+        res = db.sensor_latest.bulk_write(ops, ordered=False)
+        return res.upserted_count + res.modified_count
+    except BulkWriteError as e:
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+        return e.details.get("nUpserted", 0) + e.details.get("nModified", 0)
+
+def rebuild_sensor_latest(client: MongoClient, db_name: str, coll: str = "sensor") -> int:
+    db = client[db_name]
+    for keys in SENSOR_LATEST_INDEXES:
+        db.sensor_latest.create_index(keys)
+    # Read the watermark first: anything inserted while rebuilding is picked up by the next refresh.
+    last = next(db[coll].find({}, {"ts": 1}).sort("ts", -1).limit(1), None)
+    for kind in ("sensor", "equipment"):
+        field = f"meta.{kind}_id"
+        db[coll].aggregate([
+            {"$sort": {field: 1, "ts": -1, "meta.sensor_id": 1}},   # (meta.<kind>_id, ts desc) index
+            {"$group": {"_id": f"${field}", "doc": {"$first": "$$ROOT"}}},
+            {"$match": {"_id": {"$ne": None}}},
+            {"$replaceRoot": {"newRoot": {"$mergeObjects": [
+                "$doc", {"_id": {"$concat": [f"{kind}:", "$_id"]}, "kind": kind}]}}},
+            {"$merge": {"into": "sensor_latest", "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ], allowDiskUse=True)
+    if last:
+        db.sensor_latest.update_one({"_id": "_watermark"}, {"$set": {"ts": last["ts"]}, "$currentDate": {"updated": True}},
+                                    upsert=True)
+    return db.sensor_latest.count_documents({"kind": {"$in": ["sensor", "equipment"]}})
+
+def refresh_sensor_latest(client: MongoClient, db_name: str, coll: str = "sensor",
+                          batch_size: int = 5_000) -> int:
+    # Fold sensor documents from the watermark on into sensor_latest (full rebuild the first time).
+    # Every sensor reports on the same timestamps, so readings for the watermark's own ts may
+    # still be arriving: they are read again (`$gte`) on every refresh, and batches end on a ts
+    # boundary. Returns the number of snapshot entries that changed.
+    db = client[db_name]
+    mark = db.sensor_latest.find_one({"_id": "_watermark"})
+    if mark is None:
+        return rebuild_sensor_latest(client, db_name, coll)
+    n, batch = 0, []
+
+    def flush():
+        changed = upsert_sensor_latest(db, batch)
+        if changed or batch[-1]["ts"] != mark["ts"]:
+            db.sensor_latest.update_one({"_id": "_watermark"},
+                                        {"$set": {"ts": batch[-1]["ts"]}, "$currentDate": {"updated": True}})
+        return changed
+
+    for doc in db[coll].find({"ts": {"$gte": mark["ts"]}}).sort("ts", 1).batch_size(batch_size):
+        if len(batch) >= batch_size and doc["ts"] != batch[-1]["ts"]:
+            n, batch = n + flush(), []
+        batch.append(doc)
+    if batch:
+        n += flush()
+    return n
+
+# sensor_counters: running totals per sensor ("sensor:<id>:<hour>") and per equipment
+# ("equipment:<id>:<hour>") per hour bucket: readings, failures (status != "ok") and the
+# count/sum/sum of squares of each reading, so failure rates, volumes, means and variances,
+# overall or for the last N hours, read one small document per entity and hour instead of
+# grouping the whole sensor history. "_watermark" holds the time of the last change, for the
+# dashboard's result cache.
+SENSOR_COUNTER_READINGS = {"temperature": "temperature_c", "humidity": "humidity_pct",
+                           "smoke": "smoke_concentration.value"}
+SENSOR_COUNTERS_INDEXES = [
+    [("kind", 1), ("hour", -1)],
+    [("kind", 1), ("key", 1), ("hour", -1)],
+]
+
+def _reading(doc: dict, path: str):
+    for part in path.split("."):
+        doc = doc.get(part) if isinstance(doc, dict) else None
+    return doc if isinstance(doc, (int, float)) and not isinstance(doc, bool) else None
+
+def fold_sensor_counters(db, docs: list) -> int:
+    # $inc the counters for freshly inserted sensor documents, one upsert per entity and hour.
+    from pymongo import UpdateOne
+    incs = {}
+    for d in docs:
+        meta, ts = d.get("meta") or {}, d.get("ts")
+        if ts is None:
+            continue
+        hour = ts.replace(minute=0, second=0, microsecond=0)
+        for kind in ("sensor", "equipment"):
+            key = meta.get(f"{kind}_id")
+            if key is None:
+                continue
+            _id = f"{kind}:{key}:{hour:%Y-%m-%dT%H}"
+            entry = incs.setdefault(_id, ({"kind": kind, "key": key, "hour": hour}, {}))[1]
+            entry["count"] = entry.get("count", 0) + 1
+            entry["failures"] = entry.get("failures", 0) + (d.get("status") != "ok")
+            for name, path in SENSOR_COUNTER_READINGS.items():
+                v = _reading(d, path)
+                if v is not None:
+                    for stat, x in (("n", 1), ("sum", v), ("sumsq", v * v)):
+                        entry[f"{name}.{stat}"] = entry.get(f"{name}.{stat}", 0) + x
+    ops = [UpdateOne({"_id": _id}, {"$inc": inc, "$setOnInsert": ident}, upsert=True)
+           for _id, (ident, inc) in incs.items()]
+    if ops:
+        db.sensor_counters.bulk_write(ops, ordered=False)
+        db.sensor_counters.update_one({"_id": "_watermark"}, {"$currentDate": {"ts": True}}, upsert=True)
+    return len(ops)
+
+def rebuild_sensor_counters(client: MongoClient, db_name: str, coll: str = "sensor") -> int:
+    # Backfill from the whole collection. Loads running at the same time may be counted twice
+    # or not at all; rebuild again once they finish.
+    db = client[db_name]
+    for keys in SENSOR_COUNTERS_INDEXES:
+        db.sensor_counters.create_index(keys)
+    db.sensor_counters.delete_many({})
+    for kind in ("sensor", "equipment"):
+        field = f"$meta.{kind}_id"
+        stats = {}
+        for name, path in SENSOR_COUNTER_READINGS.items():
+            value, number = f"${path}", {"$isNumber": f"${path}"}
+            stats[f"{name}_n"] = {"$sum": {"$cond": [number, 1, 0]}}
+            stats[f"{name}_sum"] = {"$sum": {"$cond": [number, value, 0]}}
+            stats[f"{name}_sumsq"] = {"$sum": {"$cond": [number, {"$multiply": [value, value]}, 0]}}
+        db[coll].aggregate([
+            {"$match": {f"meta.{kind}_id": {"$ne": None}, "ts": {"$type": "date"}}},
+            {"$group": {
+                "_id": {"key": field, "hour": {"$dateTrunc": {"date": "$ts", "unit": "hour"}}},
+                "count": {"$sum": 1},
+                "failures": {"$sum": {"$cond": [{"$ne": ["$status", "ok"]}, 1, 0]}},
+                **stats,
+            }},
+            {"$project": {
+                "_id": {"$concat": [f"{kind}:", "$_id.key", ":",
+                                    {"$dateToString": {"date": "$_id.hour", "format": "%Y-%m-%dT%H"}}]},
+                "kind": kind, "key": "$_id.key", "hour": "$_id.hour",
+                "count": 1, "failures": 1,
+                **{name: {stat: f"${name}_{stat}" for stat in ("n", "sum", "sumsq")}
+                   for name in SENSOR_COUNTER_READINGS},
+            }},
+            {"$merge": {"into": "sensor_counters", "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ], allowDiskUse=True)
+    db.sensor_counters.update_one({"_id": "_watermark"}, {"$currentDate": {"ts": True}}, upsert=True)
+    return db.sensor_counters.count_documents({"kind": {"$in": ["sensor", "equipment"]}})
+
+# sensor_alerts: anomaly events, detected incrementally as `sensor` grows. Each new reading is
+# scored against its sensor's running state, per reading (SENSOR_COUNTER_READINGS), by:
+#   zscore     more than settings["z"] EWMA standard deviations from the sensor's EWMA mean
+#              (once it has settings["warmup"] readings)
+#   rate       changing faster than settings["max_rate"][reading] per minute
+#   threshold  crossing above settings["limits"][reading]
+#   status     a status other than "ok" that differs from the sensor's previous one
+# A rule fires at most once per sensor and reading every settings["cooldown_s"]. The running
+# state is a few float arrays (one row per sensor, one column per reading) kept, as raw bytes,
+# in the "_watermark" document next to the newest sensor.ts folded in, so each refresh resumes
+# exactly where the last one stopped and only reads the new documents. Every sensor reports on
+# the same timestamps and the state can't take a reading twice, so a refresh only reads up to
+# settings["grace_s"] before now: a minute's readings are evaluated once they have all arrived.
+SENSOR_ALERT_RULES = ("zscore", "rate", "threshold", "status")
+SENSOR_ALERTS_INDEXES = [
+    [("kind", 1), ("ts", -1)],
+    [("kind", 1), ("rule", 1), ("ts", -1)],
+    [("kind", 1), ("meta.equipment_id", 1), ("ts", -1)],
+]
+_EPOCH = dt.datetime(1970, 1, 1)
+
+class AlertState:
+    ARRAYS = {"mean": 0.0, "var": 0.0, "count": 0.0, "last": np.nan, "last_ts": np.nan}
+
+    def __init__(self, doc: dict | None = None):
+        doc = doc or {}
+        self.sensors = list(doc.get("sensors", []))
+        self.equipment = list(doc.get("equipment", []))
+        self.status = list(doc.get("status", []))
+        self.row = {s: i for i, s in enumerate(self.sensors)}
+        shape = (len(self.sensors), len(SENSOR_COUNTER_READINGS))
+        for name in self.ARRAYS:
+            setattr(self, name, np.frombuffer(doc[name], dtype="<f8").reshape(shape).copy()
+                    if name in doc else np.full(shape, self.ARRAYS[name]))
+        fired = (len(self.sensors), len(SENSOR_ALERT_RULES), len(SENSOR_COUNTER_READINGS))
+        self.fired = (np.frombuffer(doc["fired"], dtype="<f8").reshape(fired).copy()
+                      if "fired" in doc else np.full(fired, -np.inf))
+
+    def rows(self, metas: list) -> np.ndarray:
+        # Row of each document's sensor; sensors seen for the first time get a new row.
+        new = []
+        for meta in metas:
+            sid = meta.get("sensor_id")
+            if sid not in self.row:
+                self.row[sid] = len(self.sensors) + len(new)
+                new.append(meta)
+        if new:
+            self.sensors += [m.get("sensor_id") for m in new]
+            self.equipment += [m.get("equipment_id") for m in new]
+            self.status += [None] * len(new)
+            for name, fill in self.ARRAYS.items():
+                arr = getattr(self, name)
+                setattr(self, name, np.vstack([arr, np.full((len(new), arr.shape[1]), fill)]))
+            self.fired = np.concatenate([self.fired, np.full((len(new),) + self.fired.shape[1:], -np.inf)])
+        return np.array([self.row[m.get("sensor_id")] for m in metas], dtype=np.int64)
+
+    def to_doc(self) -> dict:
+        return {"sensors": self.sensors, "equipment": self.equipment, "status": self.status,
+                **{name: getattr(self, name).astype("<f8").tobytes() for name in (*self.ARRAYS, "fired")}}
+
+def detect_sensor_alerts(state: AlertState, docs: list, settings: dict) -> list:
+    # Score `docs` (in ts order) and fold them into `state`; returns the alert documents.
+    # Documents are processed in rounds, each round taking the next reading of every sensor,
+    # so the updates are vectorized across sensors while staying sequential per sensor.
+    docs = [d for d in docs if isinstance(d.get("ts"), dt.datetime) and (d.get("meta") or {}).get("sensor_id")]
+    if not docs:
+        return []
+    names = list(SENSOR_COUNTER_READINGS)
+    rows = state.rows([d["meta"] for d in docs])
+    ts = np.array([(d["ts"].replace(tzinfo=None) - _EPOCH).total_seconds() for d in docs])
+    values = np.array([[_reading(d, path) for path in SENSOR_COUNTER_READINGS.values()] for d in docs], dtype=float)
+    status = [d.get("status") for d in docs]
+    alpha, z_max, warmup = settings["alpha"], settings["z"], settings["warmup"]
+    max_rate = np.array([settings["max_rate"].get(n, np.inf) for n in names])
+    limits = np.array([settings["limits"].get(n, np.inf) for n in names])
+    level = pd.Series(rows).groupby(rows).cumcount().to_numpy()
+
+    alerts = []
+    for k in range(level.max() + 1):
+        idx = np.flatnonzero(level == k)
+        s, v, t = rows[idx], values[idx], ts[idx][:, None]
+        mean, var, n, last, last_ts = (getattr(state, a)[s] for a in AlertState.ARRAYS)
+        have = ~np.isnan(v)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.where(var > 0, (v - mean) / np.sqrt(var), 0.0)
+            rate = np.where(t > last_ts, (v - last) * 60 / (t - last_ts), 0.0)
+        prev_status = [state.status[i] for i in s]
+        changed = np.array([status[i] not in (None, "ok") and status[i] != p for i, p in zip(idx, prev_status)])
+        flags = {
+            "zscore": (have & (n >= warmup) & (np.abs(z) > z_max), z),
+            "rate": (have & ~np.isnan(last) & (np.abs(rate) > max_rate), rate),
+            "threshold": (have & (v > limits) & ~(last > limits), np.broadcast_to(limits, v.shape)),
+            "status": (np.pad(changed[:, None], ((0, 0), (0, len(names) - 1))), np.zeros(v.shape)),
+        }
+        for r, rule in enumerate(SENSOR_ALERT_RULES):
+            flag, score = flags[rule]
+            fired = state.fired[s, r]
+            flag = flag & (t - fired >= settings["cooldown_s"])
+            state.fired[s, r] = np.where(flag, t, fired)
+            for i, c in zip(*np.nonzero(flag)):
+                d = docs[idx[i]]
+                reading = names[c] if rule != "status" else None
+                alerts.append({
+                    "_id": f"{d['meta']['sensor_id']}:{d['ts'].isoformat()}:{rule}" + (f":{reading}" if reading else ""),
+                    "kind": "alert", "ts": d["ts"], "meta": d["meta"], "rule": rule, "reading": reading,
+                    "value": float(v[i, c]) if reading else None,
+                    "score": round(float(score[i, c]), 3) if reading else None,
+                    "baseline": round(float(mean[i, c]), 3) if reading and n[i, c] else None,
+                    "status": d.get("status"), "previous_status": prev_status[i],
+                })
+
+        # West's incremental EWMA mean and variance
+        delta = v - mean
+        state.mean[s] = np.where(have, np.where(n > 0, mean + alpha * delta, v), mean)
+        state.var[s] = np.where(have & (n > 0), (1 - alpha) * (var + alpha * delta * delta), var)
+        state.count[s] = n + have
+        state.last[s] = np.where(have, v, last)
+        state.last_ts[s] = np.where(have, t, last_ts)
+        for i, row in zip(idx, s):
+            state.status[row] = status[i]
+    return alerts
+
+def refresh_sensor_alerts(client: MongoClient, db_name: str, settings: dict, coll: str = "sensor",
+                          batch_size: int = 5_000) -> int:
+    # Detect alerts in sensor documents newer than the watermark (the whole history the first
+    # time) and older than the grace period. Batches end on a ts boundary, so no document is
+    # skipped by the next `$gt`.
+    from pymongo.errors import BulkWriteError
+    db = client[db_name]
+    mark = db.sensor_alerts.find_one({"_id": "_watermark"})
+    if mark is None:
+        for keys in SENSOR_ALERTS_INDEXES:
+            db.sensor_alerts.create_index(keys)
+    state = AlertState(mark.get("state") if mark else None)
+    n, batch = 0, []
+
+    def flush():
+        alerts = detect_sensor_alerts(state, batch, settings)
+        if alerts:
+            try:
+                db.sensor_alerts.insert_many(alerts, ordered=False)
+            except BulkWriteError as e:   # a re-run batch collides on _id; anything else is a real failure
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+        db.sensor_alerts.replace_one({"_id": "_watermark"}, {"ts": batch[-1]["ts"], "state": state.to_doc()},
+                                     upsert=True)
+        return len(alerts)
+
+    upto = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None) - dt.timedelta(seconds=settings["grace_s"])
+    window = {"$gt": mark["ts"], "$lte": upto} if mark else {"$lte": upto}
+    for doc in db[coll].find({"ts": window}).sort("ts", 1).batch_size(batch_size):
+        if len(batch) >= batch_size and doc["ts"] != batch[-1]["ts"]:
+            n, batch = n + flush(), []
+        batch.append(doc)
+    if batch:
+        n += flush()
+    return n
+
+def rebuild_sensor_alerts(client: MongoClient, db_name: str, settings: dict, coll: str = "sensor") -> int:
+    # Start over from the whole collection, e.g. after changing the settings or loading old data.
+    client[db_name].sensor_alerts.drop()
+    return refresh_sensor_alerts(client, db_name, settings, coll)
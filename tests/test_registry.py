@@ -0,0 +1,82 @@
+import itertools
+import os
+
+import pytest
+
+from registry import QueryRegistry
+
+PARAMS = {"user_id", "days"}
+GOOD_PG = """/*
+name: Orders
+chart: {type: table}
+params: [days]
+*/
+SELECT * FROM {S}.orders WHERE order_time > now() - make_interval(days => :days)
+"""
+GOOD_MONGO = """name: Latest
+collection: sensor
+aggregate:
+- {$sort: {ts: -1}}
+schema: {ts: datetime}
+chart: {type: table}
+"""
+_MTIMES = itertools.count(1_700_000_000_000_000_000, 1_000_000_000)
+
+
+def write(root, store: str, name: str, text: str):
+    folder = root / store
+    folder.mkdir(exist_ok=True)
+    path = folder / name
+    path.write_text(text, encoding="utf-8")
+    # a distinct modification time per write, even on file systems with coarse timestamps
+    mtime = next(_MTIMES)
+    os.utime(path, ns=(mtime, mtime))
+    return path
+
+
+def registry(root) -> QueryRegistry:
+    return QueryRegistry(str(root), lambda sql: sql.replace("{S}.", "app."), PARAMS)
+
+
+def test_loads_and_qualifies(tmp_path):
+    write(tmp_path, "postgres", "01_orders.sql", GOOD_PG)
+    write(tmp_path, "mongo", "01_latest.yaml", GOOD_MONGO)
+    reg = registry(tmp_path)
+    assert reg.load()
+    assert not reg.errors
+    assert "app.orders" in reg.queries["postgres"]["Orders"]["qualified"]
+    assert reg.queries["postgres"]["Orders"]["route"] == "primary"
+    assert list(reg.queries["mongo"]) == ["Latest"]
+    assert not reg.load()   # nothing changed
+
+
+@pytest.mark.parametrize("store, name, text", [
+    ("postgres", "01_orders.sql", GOOD_PG.replace("params: [days]", "params: [days]\nprewarm: {every: 5m}")),
+    ("postgres", "01_orders.sql", GOOD_PG.replace("params: [days]", "params: days")),
+    ("postgres", "01_orders.sql", GOOD_PG.replace("params: [days]", "params: [days]\nkeyset: [order_id]")),
+    ("postgres", "01_orders.sql", GOOD_PG.replace("params: [days]", "params: [days]\nprewarm: {every: 60, params: 7}")),
+    ("mongo", "01_latest.yaml", GOOD_MONGO.replace("schema: {ts: datetime}", "schema: [Data Volume]")),
+    ("mongo", "01_latest.yaml", GOOD_MONGO + "live: true\n"),
+    ("mongo", "01_latest.yaml", "- not a mapping\n"),
+])
+def test_wrongly_typed_file_keeps_last_good_version(tmp_path, store, name, text):
+    write(tmp_path, "postgres", "01_orders.sql", GOOD_PG)
+    write(tmp_path, "mongo", "01_latest.yaml", GOOD_MONGO)
+    reg = registry(tmp_path)
+    reg.load()
+    before = reg.queries[store]
+
+    path = write(tmp_path, store, name, text)
+    assert reg.load()
+    assert list(reg.errors) == [str(path)]
+    assert reg.queries[store] == before
+
+
+def test_broken_new_file_is_reported_and_skipped(tmp_path):
+    write(tmp_path, "postgres", "01_orders.sql", GOOD_PG)
+    path = write(tmp_path, "postgres", "02_broken.sql", GOOD_PG.replace("chart: {type: table}", "chart: table")
+                 .replace("name: Orders", "name: Broken"))
+    reg = registry(tmp_path)
+    reg.load()
+    assert list(reg.queries["postgres"]) == ["Orders"]
+    assert "chart" in reg.errors[str(path)]